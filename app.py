@@ -1,10 +1,21 @@
 # app.py
 # FastAPI web app: Techno Playlist Finder – API-Key protected
-import os, time, json, threading, queue, re, base64, csv
-import urllib.parse, urllib.request, urllib.error
+import os, time, re, base64, csv, asyncio, functools, contextlib
+import urllib.parse
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, List
-
+from typing import Dict, Any, Iterator, List
+
+import httpx
+import orjson
+try:
+    import re2 as re_scan  # google-re2: linear-time matching for third-party HTML
+except ImportError:
+    re_scan = re
+try:
+    from selectolax.lexbor import LexborHTMLParser  # C HTML5 parser for DuckDuckGo result pages
+except ImportError:
+    LexborHTMLParser = None
 from fastapi import FastAPI, HTTPException, Depends, Header
 from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,9 +24,13 @@ APP_TITLE = "Techno Playlist Finder – Web"
 USER_AGENT = "TechnoPlaylistFinder/Server-1.1"
 HTTP_TIMEOUT = 8
 HTTP_RETRIES = 2
+MAX_RETRY_AFTER = 60  # cap on a server-sent Retry-After, in seconds
+MAX_HTML_BYTES = 2_000_000  # scraped pages beyond this are skipped (or truncated when unsized)
+TOKEN_REFRESH_MARGIN = 120  # seconds before expiry at which the Spotify token is renewed
 
 SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID", "")
 SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET", "")
+SPOTIFY_BASIC_AUTH = "Basic " + base64.b64encode(f"{SPOTIFY_CLIENT_ID}:{SPOTIFY_CLIENT_SECRET}".encode("utf-8")).decode("ascii") if SPOTIFY_CLIENT_ID else ""
 SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
 SPOTIFY_API_BASE = "https://api.spotify.com/v1"
 DUCKDUCKGO_HTML = "https://duckduckgo.com/html/?q={q}&kl=wt-wde&kp=1"
@@ -23,7 +38,11 @@ DUCKDUCKGO_HTML = "https://duckduckgo.com/html/?q={q}&kl=wt-wde&kp=1"
 MAX_SPOTIFY_PAGES = int(os.getenv("MAX_SPOTIFY_PAGES", "3"))
 MAX_LINKS_PER_QUERY = int(os.getenv("MAX_LINKS_PER_QUERY", "6"))
 PER_DOMAIN_COOLDOWN = float(os.getenv("PER_DOMAIN_COOLDOWN", "0.8"))
-GLOBAL_COOLDOWN = float(os.getenv("GLOBAL_COOLDOWN", "0.15"))
+PER_HOST_CONCURRENCY = int(os.getenv("PER_HOST_CONCURRENCY", "4"))
+SPOTIFY_CONCURRENCY = int(os.getenv("SPOTIFY_CONCURRENCY", "10"))
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "8"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "4096"))
 
 API_KEY = os.getenv("API_KEY", "")  # required for protected routes
 
@@ -33,24 +52,37 @@ TECHNO_GENRES = [
     "Driving Techno","Raw Techno","Hypnotic Techno","Minimal Techno"
 ]
 
-EMAIL_RE = re.compile(r"[a-zA-Z0-9_.+\-]+@[a-zA-Z0-9\-]+\.[a-zA-Z0-9.\-]+")
-URL_RE = re.compile(r"(https?://[^\s\"'<>]+)")
-SOCIAL_REGEXES = [
-    re.compile(r"(https?://(www\.)?instagram\.com/[A-Za-z0-9_.]+)/?"),
-    re.compile(r"(https?://(www\.)?facebook\.com/[A-Za-z0-9_.-]+)/?"),
-    re.compile(r"(https?://(www\.)?x\.com/[A-Za-z0-9_.-]+)/?"),
-    re.compile(r"(https?://(www\.)?twitter\.com/[A-Za-z0-9_.-]+)/?"),
-    re.compile(r"(https?://(www\.)?soundcloud\.com/[A-Za-z0-9_.-]+)/?"),
-    re.compile(r"(https?://(www\.)?bandcamp\.com/[A-Za-z0-9_.-]+)/?"),
-    re.compile(r"(https?://(www\.)?youtube\.com/[A-Za-z0-9_.\-/?=&]+)"),
-]
+URL_RE = re_scan.compile(r"(https?://[^\s\"'<>]+)")
+EMAIL_RE = re_scan.compile(r"[a-zA-Z0-9_.+\-]+@[a-zA-Z0-9\-]+\.[a-zA-Z0-9.\-]+")
+# emails and social profile links in one alternation, so a page is scanned once
+CONTACT_RE = re_scan.compile(
+    r"(?P<email>" + EMAIL_RE.pattern + r")"
+    r"|(?P<social>https?://(?:www\.)?(?:"
+    r"instagram\.com/[A-Za-z0-9_.]+"
+    r"|facebook\.com/[A-Za-z0-9_.-]+"
+    r"|x\.com/[A-Za-z0-9_.-]+"
+    r"|twitter\.com/[A-Za-z0-9_.-]+"
+    r"|soundcloud\.com/[A-Za-z0-9_.-]+"
+    r"|bandcamp\.com/[A-Za-z0-9_.-]+"
+    r"|youtube\.com/[A-Za-z0-9_.\-/?=&]+"
+    r"))/?"
+)
+SOCIAL_DOMAINS = ("instagram.com","facebook.com","x.com","twitter.com","soundcloud.com","bandcamp.com","youtube.com")
+# literal alternation -> a single automaton pass per URL instead of one substring search per domain
+SOCIAL_DOMAIN_RE = re_scan.compile("|".join(re.escape(d) for d in SOCIAL_DOMAINS))
+DDG_LINK_RE = re_scan.compile(r'<a[^>]+class="[^"]*result__a[^"]*"[^>]+href="([^"]+)"')
 
 TRUSTED_PLATFORMS = {"soundplate.com","dailyplaylists.com","groover.co","artist.tools","droptrack.com","electronicradar.com","imusician.pro"}
 FREE_EMAILS = {"gmail.com","outlook.com","hotmail.com","yahoo.com","proton.me","protonmail.com","gmx.de","web.de","icloud.com","me.com"}
+# (max in-flight, cooldown) per host; the Spotify API rate-limits itself, the scrape cooldown is for websites
+HOST_LIMITS = {"api.spotify.com": (SPOTIFY_CONCURRENCY, 0.0)}
 
 # ---- Globals ----
 JOBS: Dict[str, Dict[str, Any]] = {}
 TOK_CACHE: Dict[str, Any] = {"access_token":"","exp":0}
+HTTP_CLIENT: httpx.AsyncClient = None  # created on startup, shared keep-alive pool
+_token_task: asyncio.Task = None
+LOG_END = None  # sentinel pushed onto a job's log queue once its task has finished
 
 # ---- Security ----
 def require_key(x_api_key: str = Header(None)):
@@ -60,84 +92,246 @@ def require_key(x_api_key: str = Header(None)):
         raise HTTPException(401, "unauthorized")
 
 # ---- Utils ----
-_last_hit_by_domain = {}
-def _cooldown_for(url: str):
+@functools.lru_cache(maxsize=4096)
+def _host_of(url: str) -> str:
     try:
-        host = urllib.parse.urlparse(url).netloc.lower()
+        return urllib.parse.urlparse(url).netloc.lower()
     except Exception:
-        host = ""
-    now = time.time()
-    last = _last_hit_by_domain.get(host, 0.0)
-    wait_needed = PER_DOMAIN_COOLDOWN - (now - last)
-    if wait_needed > 0:
-        time.sleep(wait_needed)
-    _last_hit_by_domain[host] = time.time()
-    time.sleep(GLOBAL_COOLDOWN)
-
-def _with_retries(func, *args, **kwargs):
+        return ""
+
+class HostLimiter:
+    """Per-host pacing: bounded in-flight requests and request starts spaced min_interval apart.
+    Only the host being paced waits; requests to other hosts proceed in parallel.
+    State for a host is dropped once it is idle and its next start time has passed."""
+    PRUNE_AT = 256  # sweep stale start times once this many hosts are tracked
+
+    def __init__(self, min_interval: float, concurrency: int, overrides: Dict[str, tuple] = None):
+        self.min = min_interval
+        self.concurrency = concurrency
+        self.overrides = overrides or {}
+        self.next: Dict[str, float] = {}
+        self.sems: Dict[str, asyncio.Semaphore] = {}
+        self.users: Dict[str, int] = {}  # callers holding or waiting for a host's semaphore
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host: str):
+        sem = self.sems.get(host)
+        if sem is None:
+            sem = self.sems[host] = asyncio.Semaphore(self.overrides.get(host, (self.concurrency,))[0])
+        self.users[host] = self.users.get(host, 0) + 1
+        try:
+            async with sem:
+                yield
+        finally:
+            self.users[host] -= 1
+            if not self.users[host]:
+                # nobody holds or waits on it, so a fresh semaphore later is equivalent
+                del self.users[host], self.sems[host]
+                self._prune(host)
+
+    def _prune(self, host: str):
+        now = asyncio.get_running_loop().time()
+        if self.next.get(host, now) <= now:
+            self.next.pop(host, None)
+        if len(self.next) > self.PRUNE_AT:
+            # idle hosts whose pacing window (or 429 deferral) ran out after they went idle
+            for h in [h for h, t in self.next.items() if t <= now and h not in self.users]:
+                del self.next[h]
+
+    async def acquire(self, host: str):
+        interval = self.overrides.get(host, (0, self.min))[1]
+        now = asyncio.get_running_loop().time()
+        start = max(self.next.get(host, 0.0), now)
+        self.next[host] = start + interval  # reserve before sleeping so concurrent callers queue up
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def defer(self, host: str, delay: float):
+        # a 429 pauses every queued request to the host, not just the one that was refused
+        until = asyncio.get_running_loop().time() + delay
+        self.next[host] = max(self.next.get(host, 0.0), until)
+
+HOST_LIMITER = HostLimiter(PER_DOMAIN_COOLDOWN, PER_HOST_CONCURRENCY, HOST_LIMITS)
+
+def _retry_after(resp) -> float:
+    try:
+        return min(max(float(resp.headers.get("retry-after", "")), 0.0), MAX_RETRY_AFTER)
+    except ValueError:
+        return 1.0
+
+async def _with_retries(func, *args, **kwargs):
     last = None
     for i in range(HTTP_RETRIES+1):
         try:
-            return func(*args, **kwargs)
+            return await func(*args, **kwargs)
         except Exception as e:
             last = e
-            time.sleep(0.25 * (i+1))
+            resp = getattr(e, "response", None)
+            if resp is not None and resp.status_code == 429:
+                # the limiter holds the retry (and everyone else on that host) until Retry-After has passed
+                HOST_LIMITER.defer(_host_of(str(resp.request.url)), _retry_after(resp))
+                continue
+            await asyncio.sleep(0.25 * (i+1))
     raise last
 
-def http_post(url, data, headers=None, timeout=8):
-    def do():
-        _cooldown_for(url)
-        payload = urllib.parse.urlencode(data).encode("utf-8")
-        req = urllib.request.Request(url, data=payload, headers=headers or {}, method="POST")
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            return resp.read().decode("utf-8")
-    return _with_retries(do)
-
-def http_get(url, headers=None, timeout=8):
-    def do():
-        _cooldown_for(url)
-        req = urllib.request.Request(url, headers=headers or {}, method="GET")
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            return resp.read().decode("utf-8", errors="ignore")
-    return _with_retries(do)
-
-def get_spotify_token():
-    now = time.time()
-    if TOK_CACHE["access_token"] and TOK_CACHE["exp"] > now + 30:
+async def http_post(url, data, headers=None, timeout=HTTP_TIMEOUT):
+    host = _host_of(url)
+    async def do():
+        async with HOST_LIMITER.slot(host):
+            await HOST_LIMITER.acquire(host)
+            resp = await HTTP_CLIENT.post(url, data=data, headers=headers or {}, timeout=timeout)
+        resp.raise_for_status()
+        return resp.text
+    return await _with_retries(do)
+
+def _content_length(resp) -> int:
+    # a malformed header counts as unsized; the read loop still caps the body
+    try:
+        return int(resp.headers.get("content-length") or 0)
+    except ValueError:
+        return 0
+
+async def http_get(url, headers=None, timeout=HTTP_TIMEOUT, html_only=False):
+    """html_only: return "" for non-HTML or oversized bodies (PDFs, images) without downloading them."""
+    host = _host_of(url)
+    async def do():
+        async with HOST_LIMITER.slot(host):
+            await HOST_LIMITER.acquire(host)
+            async with HTTP_CLIENT.stream("GET", url, headers=headers or {}, timeout=timeout) as resp:
+                resp.raise_for_status()
+                if html_only:
+                    if "html" not in resp.headers.get("content-type", "").lower():
+                        return ""
+                    if _content_length(resp) > MAX_HTML_BYTES:
+                        return ""
+                body = bytearray()
+                async for chunk in resp.aiter_bytes():
+                    body += chunk
+                    if html_only and len(body) >= MAX_HTML_BYTES:
+                        break  # unsized (chunked) body: scan what we have
+                charset = resp.charset_encoding or "utf-8"
+        try:
+            return body.decode(charset, errors="ignore")
+        except LookupError:
+            return body.decode("utf-8", errors="ignore")
+    return await _with_retries(do)
+
+_token_lock = asyncio.Lock()  # one auth round-trip at a time; waiters reuse its result
+async def get_spotify_token():
+    async with _token_lock:
+        now = time.time()
+        if TOK_CACHE["access_token"] and TOK_CACHE["exp"] > now + TOKEN_REFRESH_MARGIN:
+            return TOK_CACHE["access_token"]
+        if not SPOTIFY_CLIENT_ID or not SPOTIFY_CLIENT_SECRET:
+            raise RuntimeError("Spotify credentials missing")
+        headers = {"Authorization": SPOTIFY_BASIC_AUTH, "Content-Type": "application/x-www-form-urlencoded"}
+        raw = await http_post("https://accounts.spotify.com/api/token", {"grant_type":"client_credentials"}, headers=headers)
+        data = orjson.loads(raw)
+        TOK_CACHE["access_token"] = data.get("access_token","")
+        TOK_CACHE["exp"] = now + int(data.get("expires_in", 3600))
         return TOK_CACHE["access_token"]
-    if not SPOTIFY_CLIENT_ID or not SPOTIFY_CLIENT_SECRET:
-        raise RuntimeError("Spotify credentials missing")
-    auth = base64.b64encode(f"{SPOTIFY_CLIENT_ID}:{SPOTIFY_CLIENT_SECRET}".encode("utf-8")).decode("ascii")
-    headers = {"Authorization": f"Basic {auth}", "Content-Type": "application/x-www-form-urlencoded"}
-    raw = http_post("https://accounts.spotify.com/api/token", {"grant_type":"client_credentials"}, headers=headers)
-    data = json.loads(raw)
-    TOK_CACHE["access_token"] = data.get("access_token","")
-    TOK_CACHE["exp"] = now + int(data.get("expires_in", 3600))
-    return TOK_CACHE["access_token"]
-
-def spotify_get(path, token, params=None):
+
+async def _refresh_token_loop():
+    # keeps the cached token fresh so /start never waits on accounts.spotify.com
+    while True:
+        try:
+            await get_spotify_token()
+            delay = TOK_CACHE["exp"] - TOKEN_REFRESH_MARGIN - time.time()
+        except Exception:
+            delay = 30
+        await asyncio.sleep(max(delay, 1))
+
+async def spotify_get(path, token, params=None):
     url = f"https://api.spotify.com/v1{path}"
     if params: url += "?" + urllib.parse.urlencode(params)
     headers = {"Authorization": f"Bearer {token}"}
-    raw = http_get(url, headers=headers); return json.loads(raw or "{}")
-
-def search_playlists(query, token, limit=20, offset=0):
-    return spotify_get("/search", token, params={"q":query, "type":"playlist", "limit":limit, "offset":offset})
-
-def get_playlist(playlist_id, token):
-    return spotify_get(f"/playlists/{playlist_id}", token)
-
-def duckduckgo_search(query):
+    raw = await http_get(url, headers=headers); return orjson.loads(raw) if raw else {}
+
+async def search_playlists(query, token, limit=20, offset=0):
+    return await spotify_get("/search", token, params={"q":query, "type":"playlist", "limit":limit, "offset":offset})
+
+class TTLCache:
+    """Small in-memory LRU with per-entry expiry; shared across jobs of this process.
+    get_or_fetch also collapses concurrent misses for one key onto a single fetch."""
+    MISS = object()
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.pending: Dict[Any, list] = {}  # key -> [fetch task, number of waiting callers]
+
+    def get(self, key):
+        hit = self.data.get(key)
+        if hit is None:
+            return self.MISS
+        exp, value = hit
+        if exp < time.monotonic():
+            del self.data[key]
+            return self.MISS
+        self.data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.data[key] = (time.monotonic() + self.ttl, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    async def get_or_fetch(self, key, fetch, keep=lambda value: True):
+        value = self.get(key)
+        if value is not self.MISS:
+            return value
+        entry = self.pending.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(fetch())
+            entry = self.pending[key] = [task, 0]
+            task.add_done_callback(lambda t: self._settle(key, t, keep))
+        task = entry[0]
+        entry[1] += 1
+        try:
+            # shielded: one cancelled caller must not cancel the fetch other callers are waiting on
+            return await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                task.cancel()  # every caller was cancelled, so nobody wants the result any more
+
+    def _settle(self, key, task, keep):
+        if self.pending.get(key, (None,))[0] is task:
+            del self.pending[key]
+        if not task.cancelled() and task.exception() is None and keep(task.result()):
+            self.set(key, task.result())
+
+PLAYLIST_CACHE = TTLCache(CACHE_MAXSIZE, CACHE_TTL)
+DDG_CACHE = TTLCache(CACHE_MAXSIZE, CACHE_TTL)
+
+# only what process_playlist reads; without it Spotify also sends up to 100 full track objects
+PLAYLIST_FIELDS = "name,description,followers(total),owner(id,display_name,external_urls),external_urls"
+
+async def get_playlist(playlist_id, token):
+    return await PLAYLIST_CACHE.get_or_fetch(
+        playlist_id, lambda: spotify_get(f"/playlists/{playlist_id}", token, params={"fields": PLAYLIST_FIELDS}))
+
+def _ddg_result_hrefs(html_text):
+    if LexborHTMLParser is None:
+        return DDG_LINK_RE.findall(html_text)
+    return [a.attributes.get("href") or "" for a in LexborHTMLParser(html_text).css("a.result__a")]
+
+async def duckduckgo_search(query):
+    # an empty page is usually a throttling challenge (202), not a real "no results", so it is not cached
+    return await DDG_CACHE.get_or_fetch(query, lambda: _fetch_ddg(query), keep=bool)
+
+async def _fetch_ddg(query):
     url = "https://duckduckgo.com/html/?q={q}&kl=wt-wde&kp=1".format(q=urllib.parse.quote(query))
     try:
-        html_text = http_get(url, headers={"User-Agent": USER_AGENT}, timeout=8) or ""
+        html_text = await http_get(url, headers={"User-Agent": USER_AGENT}, html_only=True) or ""
     except Exception:
         return []
-    links = re.findall(r'<a[^>]+class="[^"]*result__a[^"]*"[^>]+href="([^"]+)"', html_text)
     out = []
-    for href in links:
+    for href in _ddg_result_hrefs(html_text):
         try:
-            href = urllib.parse.unquote(href)
+            # parse_qs percent-decodes uddg itself; unquoting first would split target URLs on their own "&"
             parsed = urllib.parse.urlparse(href); qs = urllib.parse.parse_qs(parsed.query)
             real = qs.get('uddg',[href])[0]
             if real.startswith("http"):
@@ -146,54 +340,43 @@ def duckduckgo_search(query):
             continue
     return out[:6]
 
+def _scan_contacts(text):
+    found = {"email": set(), "social": set()}
+    for m in CONTACT_RE.finditer(text):
+        kind = m.lastgroup
+        found[kind].add(m.group(kind))
+        if kind == "social" and text[m.end():m.end()+1] == "@":
+            # the alternation consumed the local part of an email ("instagram.com/a.b@c.de",
+            # "watch?v=a&email=me@x.com"); none of the social patterns allow "@", so this is the only overlap
+            em = EMAIL_RE.search(text, m.start())
+            if em: found["email"].add(em.group())
+    return found["email"], found["social"]
+
 def extract_contacts_from_html(html_text):
-    emails = set(re.findall(r"[a-zA-Z0-9_.+\-]+@[a-zA-Z0-9\-]+\.[a-zA-Z0-9.\-]+", html_text or ""))
-    socials = set()
-    for rx in [
-        re.compile(r"(https?://(www\.)?instagram\.com/[A-Za-z0-9_.]+)/?"),
-        re.compile(r"(https?://(www\.)?facebook\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?x\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?twitter\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?soundcloud\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?bandcamp\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?youtube\.com/[A-Za-z0-9_.\-/?=&]+)"),
-    ]:
-        for m in rx.findall(html_text or ""):
-            socials.add(m[0])
+    emails, socials = _scan_contacts(html_text or "")
     return sorted(emails), sorted(socials)
 
 def extract_from_spotify_description(desc_text):
-    emails = set(re.findall(r"[a-zA-Z0-9_.+\-]+@[a-zA-Z0-9\-]+\.[a-zA-Z0-9.\-]+", desc_text or ""))
-    urls = set(re.findall(r"(https?://[^\s\"'<>]+)", desc_text or ""))
-    socials = set()
-    for rx in [
-        re.compile(r"(https?://(www\.)?instagram\.com/[A-Za-z0-9_.]+)/?"),
-        re.compile(r"(https?://(www\.)?facebook\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?x\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?twitter\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?soundcloud\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?bandcamp\.com/[A-Za-z0-9_.-]+)/?"),
-        re.compile(r"(https?://(www\.)?youtube\.com/[A-Za-z0-9_.\-/?=&]+)"),
-    ]:
-        for m in rx.findall(desc_text or ""):
-            socials.add(m[0])
+    desc_text = desc_text or ""
+    emails, socials = _scan_contacts(desc_text)
+    urls = set(URL_RE.findall(desc_text))
     return sorted(emails), sorted(urls | socials)
 
+@functools.lru_cache(maxsize=4096)
 def domain_from_url(u):
-    try:
-        host = urllib.parse.urlparse(u).netloc.lower()
-        return host[4:] if host.startswith("www.") else host
-    except Exception:
-        return ""
+    host = _host_of(u)
+    return host[4:] if host.startswith("www.") else host
+
+def owner_tokens_of(owner_name):
+    # name parts shorter than 3 chars ("dj", "mc") match far too many domains
+    return {t for t in (owner_name or "").lower().split() if len(t) >= 3}
 
-def verify_email(email, source_url, owner_name=""):
-    FREE_EMAILS = {"gmail.com","outlook.com","hotmail.com","yahoo.com","proton.me","protonmail.com","gmx.de","web.de","icloud.com","me.com"}
-    TRUSTED_PLATFORMS = {"soundplate.com","dailyplaylists.com","groover.co","artist.tools","droptrack.com","electronicradar.com","imusician.pro"}
+def verify_email(email, source_url, owner_tokens=frozenset()):
     em_dom = (email.split("@")[-1] or "").lower()
     src_dom = domain_from_url(source_url)
     if em_dom == src_dom or (src_dom and em_dom.endswith("." + src_dom)) or em_dom in TRUSTED_PLATFORMS:
         return True
-    if owner_name and any(tok for tok in owner_name.lower().split() if tok and tok in em_dom):
+    if owner_tokens and any(t in em_dom for t in owner_tokens):
         return True
     if em_dom in FREE_EMAILS:
         return False
@@ -201,135 +384,154 @@ def verify_email(email, source_url, owner_name=""):
         return True
     return False
 
-def flatten_rows(results: List[dict]) -> List[dict]:
-    rows = []
+def _base_row(base):
+    return {
+        "genre": base.get("genre",""),
+        "playlist_name": base.get("playlist_name",""),
+        "playlist_url": base.get("playlist_url",""),
+        "followers": base.get("followers",0),
+        "owner_name": base.get("owner_name",""),
+        "owner_url": base.get("owner_url",""),
+        "owner_id": base.get("owner_id",""),
+    }
+
+def iter_rows(results: List[dict]) -> Iterator[dict]:
     for base in results:
+        head = _base_row(base)
         contacts = base.get("contacts", [])
         if not contacts:
-            rows.append({
-                "genre": base.get("genre",""),
-                "playlist_name": base.get("playlist_name",""),
-                "playlist_url": base.get("playlist_url",""),
-                "followers": base.get("followers",0),
-                "owner_name": base.get("owner_name",""),
-                "owner_url": base.get("owner_url",""),
-                "owner_id": base.get("owner_id",""),
-                "contact_source": "",
-                "contact_emails": "",
-                "contact_socials": "",
-                "contact_verified": False,
-            })
+            yield {**head, "contact_source": "", "contact_emails": "", "contact_socials": "", "contact_verified": False}
         else:
             for c in contacts:
-                rows.append({
-                    "genre": base.get("genre",""),
-                    "playlist_name": base.get("playlist_name",""),
-                    "playlist_url": base.get("playlist_url",""),
-                    "followers": base.get("followers",0),
-                    "owner_name": base.get("owner_name",""),
-                    "owner_url": base.get("owner_url",""),
-                    "owner_id": base.get("owner_id",""),
+                yield {
+                    **head,
                     "contact_source": c.get("source_url",""),
                     "contact_emails": "; ".join(c.get("emails",[])),
                     "contact_socials": "; ".join(c.get("socials",[])),
                     "contact_verified": c.get("verified", False),
+                }
+
+async def search_candidates(job, q, token):
+    # all result pages of one query at once; keep them in page order up to the first empty or failed one
+    job["log"].put_nowait(f"Spotify-Suche: {q}")
+    pages = await asyncio.gather(
+        *(search_playlists(q, token, limit=20, offset=page*20) for page in range(MAX_SPOTIFY_PAGES)),
+        return_exceptions=True,
+    )
+    items = []
+    for data in pages:
+        if isinstance(data, BaseException):
+            job["log"].put_nowait(f"Spotify API Fehler: {data}")
+            break
+        page_items = ((((data or {}).get("playlists") or {}).get("items")) or [])
+        if not page_items: break
+        items.extend(page_items)
+    return items
+
+async def process_playlist(job, plid, q, token):
+    if job["cancel"]: return None
+    try:
+        det = await get_playlist(plid, token) or {}
+    except Exception as e:
+        job["log"].put_nowait(f"Spotify Playlist {plid} übersprungen: {e}")
+        return None
+    followers = int(((det.get("followers") or {}).get("total")) or 0)
+    if followers < job["params"]["min_followers"]: return None
+    owner = (det.get("owner") or {})
+    owner_id = owner.get("id","")
+    owner_name = owner.get("display_name") or owner_id or ""
+    owner_tokens = owner_tokens_of(owner_name)
+    owner_urls = owner.get("external_urls") or {}
+    owner_url = owner_urls.get("spotify","")
+    pl_urls = det.get("external_urls") or {}
+    pl_url = pl_urls.get("spotify","")
+    row = {
+        "genre": q.replace(" playlist",""),
+        "playlist_name": det.get("name",""),
+        "playlist_url": pl_url,
+        "followers": followers,
+        "owner_name": owner_name, "owner_id": owner_id, "owner_url": owner_url,
+        "contacts": []
+    }
+    desc = det.get("description") or ""
+    desc_emails, desc_urls = extract_from_spotify_description(desc)
+    if desc_emails or desc_urls:
+        verified = [e for e in desc_emails if verify_email(e, "https://open.spotify.com", owner_tokens)]
+        row["contacts"].append({
+            "source_url": "spotify:description",
+            "emails": verified,
+            "raw_emails": desc_emails,
+            "socials": [u for u in desc_urls if SOCIAL_DOMAIN_RE.search(u)],
+            "verified": bool(verified),
+        })
+    # listed before enrichment (contacts are added in place), so a hard cancel keeps the description contacts
+    job["results"].append(row)
+    rqs = [f"{owner_name} contact OR kontakt OR impressum email submit music",
+           f"{row['playlist_name']} contact OR kontakt OR submit music email"]
+    if not job["cancel"]:
+        # both searches and all result pages in flight at once; per-host pacing lives in http_get
+        search_results = await asyncio.gather(*(duckduckgo_search(rq) for rq in rqs))
+        links = list(dict.fromkeys(l for found in search_results for l in found))
+        pages = await asyncio.gather(
+            *(http_get(l, headers={"User-Agent": USER_AGENT}, html_only=True) for l in links),
+            return_exceptions=True,
+        )
+        for link, html in zip(links, pages):
+            if isinstance(html, BaseException): continue
+            emails, socials = extract_contacts_from_html(html)
+            verified = [e for e in emails if verify_email(e, link, owner_tokens)]
+            if verified or socials:
+                row["contacts"].append({
+                    "source_url": link,
+                    "emails": verified,
+                    "raw_emails": emails,
+                    "socials": socials,
+                    "verified": bool(verified),
                 })
-    return rows
+    job["last_item"] = {"playlist": row["playlist_name"], "owner": owner_name, "url": row["playlist_url"]}
+    return row
 
-def run_job(job):
+async def run_job(job):
     job["status"] = "running"
     job["progress"] = 0
-    job["log"].put("Starte Job …")
+    job["log"].put_nowait("Starte Job …")
     try:
-        token = get_spotify_token()
+        token = await get_spotify_token()
     except Exception as e:
         job["status"] = "error"
-        job["log"].put(f"Auth-Fehler: {e}")
+        job["log"].put_nowait(f"Auth-Fehler: {e}")
         return
-    genres = job["params"]["genres"]
-    min_followers = job["params"]["min_followers"]
-    queries = [f"{g} playlist" for g in genres]
-    results = []
+    queries = [f"{g} playlist" for g in job["params"]["genres"]]
+    found = await asyncio.gather(*(search_candidates(job, q, token) for q in queries))
+    # dedupe before scheduling, in query order, so no locking is needed afterwards
     seen_playlists = set()
-    step_total = max(len(queries),1)
-    job["total_steps"] = step_total
-    for q in queries:
-        if job["cancel"]: break
-        job["log"].put(f"Spotify-Suche: {q}")
-        for page in range(3):
-            if job["cancel"]: break
+    candidates = []
+    for q, items in zip(queries, found):
+        for it in items:
+            if not isinstance(it, dict): continue
+            plid = it.get("id")
+            if not plid or plid in seen_playlists: continue
+            seen_playlists.add(plid)
+            candidates.append((plid, q))
+    job["total_steps"] = max(len(candidates),1)
+    sem = asyncio.Semaphore(JOB_CONCURRENCY)
+    async def bounded(plid, q):
+        async with sem:
             try:
-                data = search_playlists(q, token, limit=20, offset=page*20) or {}
-            except Exception as e:
-                job["log"].put(f"Spotify API Fehler: {e}")
-                break
-            items = (((data.get("playlists") or {}).get("items")) or [])
-            if not items: break
-            for idx, it in enumerate(items):
-                if job["cancel"]: break
-                if not isinstance(it, dict): continue
-                plid = it.get("id")
-                if not plid or plid in seen_playlists: continue
-                seen_playlists.add(plid)
-                try:
-                    det = get_playlist(plid, token) or {}
-                except Exception:
-                    continue
-                followers = int(((det.get("followers") or {}).get("total")) or 0)
-                if followers < min_followers: continue
-                owner = (det.get("owner") or {})
-                owner_id = owner.get("id","")
-                owner_name = owner.get("display_name") or owner_id or ""
-                owner_urls = owner.get("external_urls") or {}
-                owner_url = owner_urls.get("spotify","")
-                pl_urls = det.get("external_urls") or {}
-                pl_url = pl_urls.get("spotify","")
-                row = {
-                    "genre": q.replace(" playlist",""),
-                    "playlist_name": det.get("name",""),
-                    "playlist_url": pl_url,
-                    "followers": followers,
-                    "owner_name": owner_name, "owner_id": owner_id, "owner_url": owner_url,
-                    "contacts": []
-                }
-                desc = det.get("description") or ""
-                desc_emails, desc_urls = extract_from_spotify_description(desc)
-                if desc_emails or desc_urls:
-                    verified = [e for e in desc_emails if verify_email(e, "https://open.spotify.com", owner_name)]
-                    row["contacts"].append({
-                        "source_url": "spotify:description",
-                        "emails": verified,
-                        "raw_emails": desc_emails,
-                        "socials": [u for u in desc_urls if any(dom in u for dom in ["instagram.com","facebook.com","x.com","twitter.com","soundcloud.com","bandcamp.com","youtube.com"])],
-                        "verified": bool(verified),
-                    })
-                for rq in [f"{owner_name} contact OR kontakt OR impressum email submit music",
-                           f"{row['playlist_name']} contact OR kontakt OR submit music email"][:2]:
-                    if job["cancel"]: break
-                    links = duckduckgo_search(rq)
-                    for link in links:
-                        try:
-                            html = http_get(link, headers={"User-Agent": USER_AGENT}, timeout=8)
-                        except Exception:
-                            continue
-                        emails, socials = extract_contacts_from_html(html)
-                        verified = [e for e in emails if verify_email(e, link, owner_name)]
-                        if verified or socials:
-                            row["contacts"].append({
-                                "source_url": link,
-                                "emails": verified,
-                                "raw_emails": emails,
-                                "socials": socials,
-                                "verified": bool(verified),
-                            })
-                        time.sleep(0.03)
-                results.append(row)
-                job["last_item"] = {"playlist": row["playlist_name"], "owner": owner_name, "url": row["playlist_url"]}
-            time.sleep(0.05)
-        job["progress"] += 1
-    job["results"] = results
+                row = await process_playlist(job, plid, q, token)
+            except Exception:
+                job["progress"] += 1
+                raise
+        job["progress"] += 1  # cancelled playlists are not counted as processed
+        return row
+    # one malformed playlist must not end the job while its siblings keep running
+    rows = await asyncio.gather(*(bounded(p, q) for p, q in candidates), return_exceptions=True)
+    for (plid, _q), r in zip(candidates, rows):
+        if isinstance(r, Exception):
+            job["log"].put_nowait(f"Playlist {plid} übersprungen: {r}")
+    job["results"][:] = [r for r in rows if isinstance(r, dict)]  # back to query order
     job["status"] = "cancelled" if job["cancel"] else "done"
-    job["log"].put("Job beendet." if not job["cancel"] else "Job abgebrochen.")
+    job["log"].put_nowait("Job beendet." if not job["cancel"] else "Job abgebrochen.")
 
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
@@ -344,6 +546,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def _open_http_client():
+    global HTTP_CLIENT
+    # HTTP/2 multiplexes concurrent requests to one host over a single connection
+    HTTP_CLIENT = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=100),
+        headers={"Accept-Encoding": "gzip, br"},
+        timeout=HTTP_TIMEOUT,
+        follow_redirects=True,
+    )
+
+@app.on_event("startup")
+async def _start_token_refresh():
+    global _token_task
+    if SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET:
+        _token_task = asyncio.create_task(_refresh_token_loop())
+
+@app.on_event("shutdown")
+async def _shutdown():
+    if _token_task is not None:
+        _token_task.cancel()
+    if HTTP_CLIENT is not None:
+        await HTTP_CLIENT.aclose()
+
 def html_page():
     genres_options = "".join([f'<label><input type="checkbox" name="genre" value="{g}" {"checked" if g in ["Techno","Hard Techno","Melodic Techno","Peak Time Techno"] else ""}/> {g}</label><br/>' for g in TECHNOGENRES]) if False else ""
     # Simplify: regenerate options:
@@ -369,7 +596,7 @@ async function startJob(){{
   const res=await fetch('/start',{{method:'POST',headers:{{'Content-Type':'application/json'}},body:JSON.stringify({{genres,min_followers:minf}})}});
   const data=await res.json(); JOB_ID=data.job_id; log('Job '+JOB_ID);
   es = new EventSource('/progress/'+JOB_ID);
-  es.onmessage=(ev)=>{{ const d=JSON.parse(ev.data); if(d.type==='log') log(d.msg);}};
+  es.onmessage=(ev)=>{{ const d=JSON.parse(ev.data); if(d.type==='log') log(d.msg); if(d.type==='done'){{ es.close(); log('Status: '+d.status); }} }};
 }}
 function log(s){{ const el=document.getElementById('log'); el.textContent+=s+"\\n"; el.scrollTop=el.scrollHeight;}}
 async function cancelJob(){{ if(!JOB_ID) return; await fetch('/cancel/'+JOB_ID,{{method:'POST'}}); log('Abbruch angefordert'); }}
@@ -381,57 +608,70 @@ def index():
 
 from fastapi import Depends
 
+def _job_finished(job, task):
+    if task.cancelled():
+        job["status"] = "cancelled"
+        job["log"].put_nowait("Job abgebrochen.")
+    elif task.exception() is not None:
+        job["status"] = "error"
+        job["log"].put_nowait(f"Fehler: {task.exception()}")
+    job["log"].put_nowait(LOG_END)
+
 @app.post("/start")
-def start_job(req: dict, _=Depends(require_key)):
+async def start_job(req: dict, _=Depends(require_key)):
     genres = req.get("genres") or []
     min_followers = int(req.get("min_followers") or 0)
     if not genres: raise HTTPException(400, "genres required")
     job_id = f"job_{int(time.time()*1000)}"
-    job = {"id":job_id,"status":"queued","progress":0,"total_steps":0,"params":{"genres":genres,"min_followers":min_followers},"results":[],"cancel":False,"log":queue.Queue(),"last_item":{}}
+    job = {"id":job_id,"status":"queued","progress":0,"total_steps":0,"params":{"genres":genres,"min_followers":min_followers},"results":[],"cancel":False,"log":asyncio.Queue(),"last_item":{}}
     JOBS[job_id]=job
-    threading.Thread(target=run_job, args=(job,), daemon=True).start()
+    job["task"] = asyncio.create_task(run_job(job))
+    job["task"].add_done_callback(lambda t: _job_finished(job, t))
     return {"job_id": job_id}
 
 @app.post("/cancel/{job_id}")
-def cancel_job(job_id: str, _=Depends(require_key)):
+async def cancel_job(job_id: str, _=Depends(require_key)):
     job = JOBS.get(job_id)
     if not job: raise HTTPException(404, "job not found")
     job["cancel"] = True
+    task = job.get("task")
+    if task is not None and not task.done():
+        task.cancel()  # interrupts in-flight requests instead of waiting for the next flag check
     return {"ok": True}
 
 @app.get("/progress/{job_id}")
-def progress(job_id: str):
+async def progress(job_id: str):
     job = JOBS.get(job_id)
     if not job: raise HTTPException(404, "job not found")
-    def gen():
-        yield f"data {{\"type\":\"log\",\"msg\":\"connect\"}}\n\n"
+    async def gen():
+        yield f"data: {{\"type\":\"log\",\"msg\":\"connect\"}}\n\n"
         while True:
-            try:
-                while True:
-                    msg = job['log'].get_nowait()
-                    yield f"data {json.dumps({'type':'log','msg':msg})}\n\n"
-            except queue.Empty:
-                pass
-            if job.get("status") in ("done","cancelled","error"):
-                yield f"data {json.dumps({'type':'done','status':job.get('status')})}\n\n"
+            msg = await job["log"].get()
+            if msg is LOG_END:
+                job["log"].put_nowait(LOG_END)  # leave it for any later subscriber
+                yield f"data: {orjson.dumps({'type':'done','status':job.get('status')}).decode()}\n\n"
                 break
-            time.sleep(0.8)
+            yield f"data: {orjson.dumps({'type':'log','msg':msg}).decode()}\n\n"
     return StreamingResponse(gen(), media_type="text/event-stream")
 
+_HTML_ESC = str.maketrans({"&":"&amp;", "<":"&lt;", ">":"&gt;", '"':"&quot;", "'":"&#x27;"})
+
 def rows_for_export(job_id: str):
     job = JOBS.get(job_id)
     if not job: raise HTTPException(404, "job not found")
-    return flatten_rows(job.get("results", []))
+    # lazy: rows are flattened while streaming; the shallow copy guards against a still-running job
+    return iter_rows(list(job.get("results", [])))
 
 from fastapi.responses import HTMLResponse
 
 @app.get("/export/html/{job_id}", response_class=HTMLResponse)
 def export_html(job_id: str):
     rows = rows_for_export(job_id)
-    def esc(s): return (str(s) or "").replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
-    html=["<html><head><meta charset='utf-8'><title>Export</title></head><body><table border='1' cellpadding='6'>"]
-    html.append("<tr><th>Genre</th><th>Playlist</th><th>Follower</th><th>Owner</th><th>Kontakt</th></tr>")
-    for r in rows or []:
-        html.append("<tr><td>"+esc(r.get("genre",""))+"</td><td>"+esc(r.get("playlist_name",""))+"</td><td>"+str(int(r.get("followers",0)))+"</td><td>"+esc(r.get("owner_name",""))+"</td><td>"+esc(r.get("contact_emails",""))+"</td></tr>")
-    html.append("</table></body></html>")
-    return HTMLResponse("".join(html))
+    def esc(s): return (s if isinstance(s, str) else str(s)).translate(_HTML_ESC)
+    def gen():
+        yield "<html><head><meta charset='utf-8'><title>Export</title></head><body><table border='1' cellpadding='6'>"
+        yield "<tr><th>Genre</th><th>Playlist</th><th>Follower</th><th>Owner</th><th>Kontakt</th></tr>"
+        for r in rows:
+            yield f"<tr><td>{esc(r.get('genre',''))}</td><td>{esc(r.get('playlist_name',''))}</td><td>{int(r.get('followers',0))}</td><td>{esc(r.get('owner_name',''))}</td><td>{esc(r.get('contact_emails',''))}</td></tr>"
+        yield "</table></body></html>"
+    return StreamingResponse(gen(), media_type="text/html")